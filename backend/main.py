@@ -1,16 +1,24 @@
 """
 FastAPI application for Emo-ch AI emotional support chatbot backend.
 """
+import asyncio
+import json
 import os
-from typing import List
+from contextlib import asynccontextmanager, nullcontext
+from typing import FrozenSet, List, Optional
 
+import orjson
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from models.schemas import ChatMessage, ChatRequest, ChatResponse, HealthResponse
-from services.ai_service import get_ai_service
-from services.session_store import get_session_store
+from models.schemas import ChatRequest, ChatResponse, GeminiMessage, HealthResponse
+from services.ai_service import FALLBACK_RESPONSE, AIService
+from services.semantic_cache import SemanticCache, create_semantic_cache
+from services.session_store import BaseSessionStore, create_session_store
 
 # Load environment variables
 load_dotenv()
@@ -21,17 +29,71 @@ def _split_origins(value: str) -> List[str]:
     return [o.strip() for o in value.split(",") if o.strip()]
 
 
+class PathExemptCORSMiddleware(CORSMiddleware):
+    """
+    CORSMiddleware that skips CORS handling for the given paths.
+    
+    Used for endpoints that are never called from a browser, such as
+    uptime probes, so they bypass the CORS checks entirely.
+    """
+
+    def __init__(self, app: ASGIApp, exempt_paths: FrozenSet[str] = frozenset(), **kwargs):
+        super().__init__(app, **kwargs)
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create shared services at startup and release their resources on shutdown.
+    
+    Raises:
+        ValueError: If GEMINI_API_KEY is not configured
+    """
+    app.state.session_store = create_session_store()
+    app.state.ai_service = AIService()
+    if os.getenv("GEMINI_PREWARM", "1").lower() not in ("0", "false", "no"):
+        await app.state.ai_service.warm_up()
+    app.state.semantic_cache = create_semantic_cache()
+    yield
+    await app.state.session_store.close()
+
+
+async def get_session_store(request: Request) -> BaseSessionStore:
+    """Dependency returning the app's session store."""
+    return request.app.state.session_store
+
+
+async def get_ai_service(request: Request) -> AIService:
+    """Dependency returning the app's AI service."""
+    return request.app.state.ai_service
+
+
+async def get_semantic_cache(request: Request) -> Optional[SemanticCache]:
+    """Dependency returning the app's semantic cache, or None if disabled."""
+    return request.app.state.semantic_cache
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Emo-ch AI Backend",
     version="1.0.0",
-    description="Emotional support chatbot API powered by Google Gemini"
+    description="Emotional support chatbot API powered by Google Gemini",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# Configure CORS
-allowed_origins = _split_origins(os.getenv("ALLOWED_ORIGINS", "http://localhost:8080"))
+# Configure CORS (a frozenset makes the per-request origin check a hash lookup)
+allowed_origins = frozenset(_split_origins(os.getenv("ALLOWED_ORIGINS", "http://localhost:8080")))
 app.add_middleware(
-    CORSMiddleware,
+    PathExemptCORSMiddleware,
+    exempt_paths=frozenset({"/health"}),
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["*"],
@@ -39,27 +101,44 @@ app.add_middleware(
 )
 
 
+# The health payload never changes, so encode it once
+_HEALTH_BODY = orjson.dumps(HealthResponse(status="ok").model_dump())
+
+
 @app.get("/health", response_model=HealthResponse)
-def health_check():
+async def health_check():
     """
     Health check endpoint to verify the API is running.
     
+    Returns the pre-encoded HealthResponse body directly, skipping model
+    validation and serialization on every probe.
+    
     Returns:
         HealthResponse with status "ok"
     """
-    return HealthResponse(status="ok")
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest) -> ChatResponse:
+async def chat(
+    request: ChatRequest,
+    session_store: BaseSessionStore = Depends(get_session_store),
+    ai_service: AIService = Depends(get_ai_service),
+    semantic_cache: Optional[SemanticCache] = Depends(get_semantic_cache)
+) -> ChatResponse:
     """
     Main chat endpoint that generates empathetic AI responses.
     
     Maintains conversation history server-side using session_id.
-    Each request appends the user message, gets AI response, and saves both to session.
+    Each request gets the AI response for the user message and then saves both to session.
+    The Gemini call is awaited, so concurrent requests overlap on the event loop
+    instead of each blocking a worker thread.
     
     Args:
         request: ChatRequest containing user message and optional session_id
+        session_store: Injected session store
+        ai_service: Injected AI service
+        semantic_cache: Injected semantic cache, None if disabled
         
     Returns:
         ChatResponse with AI-generated empathetic reply and session_id
@@ -68,37 +147,127 @@ def chat(request: ChatRequest) -> ChatResponse:
         HTTPException: If AI service fails or request is invalid
     """
     try:
-        session_store = get_session_store()
-        ai_service = get_ai_service()
+        # Serialize turns within a session so concurrent requests don't drop history;
+        # a newly created session can't have other requests in flight
+        session_lock = (
+            session_store.lock(request.session_id) if request.session_id else nullcontext()
+        )
+        async with session_lock:
+            # A single lookup both checks the session exists and retrieves its history
+            history = (
+                await session_store.get_history(request.session_id)
+                if request.session_id else None
+            )
+            if history is None:
+                # Create new session if none provided or session doesn't exist
+                session_id = await session_store.create_session()
+                history = []
+            else:
+                session_id = request.session_id
+            
+            # First messages don't depend on earlier context, so similar ones can share a reply
+            use_cache = semantic_cache is not None and not history
+            reply = None
+            if use_cache:
+                try:
+                    reply, embedding = await semantic_cache.lookup(request.message)
+                except Exception:
+                    # The cache is an optimization; fall through to Gemini if it fails
+                    use_cache = False
+            
+            if reply is None:
+                # Generate AI response; history seeds the session's chat on cache miss
+                reply = await ai_service.generate_response(
+                    user_message=request.message,
+                    session_id=session_id,
+                    history=history
+                )
+                if use_cache and reply != FALLBACK_RESPONSE:
+                    try:
+                        await semantic_cache.add(embedding, reply)
+                    except Exception:
+                        # Failing to cache must not fail a reply that was generated
+                        pass
+            
+            # Save both messages of this turn to the session store AFTER generation
+            user_message_obj: GeminiMessage = {"role": "user", "parts": [request.message]}
+            ai_message_obj: GeminiMessage = {"role": "model", "parts": [reply]}
+            await session_store.add_message(session_id, user_message_obj, ai_message_obj)
         
-        # Get or create session
-        if request.session_id and session_store.session_exists(request.session_id):
-            session_id = request.session_id
-            # Retrieve existing conversation history from session store
-            history = session_store.get_history(session_id) or []
-        else:
-            # Create new session if none provided or session doesn't exist
-            session_id = session_store.create_session()
+        return ChatResponse(reply=reply, session_id=session_id)
+        
+    except ValueError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Service configuration error: {str(e)}"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"An unexpected error occurred: {str(e)}"
+        )
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    session_store: BaseSessionStore = Depends(get_session_store),
+    ai_service: AIService = Depends(get_ai_service)
+) -> StreamingResponse:
+    """
+    Streaming variant of /chat that sends the reply as Server-Sent Events.
+    
+    Each text chunk is sent as a `data: {"delta": ...}` event as soon as Gemini
+    produces it, followed by a final `done` event carrying the session_id.
+    The session_id is also returned in the `X-Session-ID` response header.
+    Like /chat, the turn holds the session lock from reading history until
+    the completed turn is saved in a background task after the last chunk
+    has been sent. Turns cut short by a disconnect are not saved.
+    
+    Args:
+        request: ChatRequest containing user message and optional session_id
+        session_store: Injected session store
+        ai_service: Injected AI service
+        
+    Returns:
+        StreamingResponse emitting text/event-stream events
+        
+    Raises:
+        HTTPException: If AI service fails before streaming starts
+    """
+    # Serialize turns within a session; a newly created session can't have
+    # other requests in flight
+    session_lock = session_store.lock(request.session_id) if request.session_id else None
+    if session_lock is not None:
+        await session_lock.acquire()
+    turn = _StreamedTurn(session_lock)
+    streaming = False
+    
+    try:
+        # A single lookup both checks the session exists and retrieves its history
+        history = (
+            await session_store.get_history(request.session_id)
+            if request.session_id else None
+        )
+        if history is None:
+            session_id = await session_store.create_session()
             history = []
+        else:
+            session_id = request.session_id
         
-        # Append user message to history BEFORE calling AI
-        user_message_obj = ChatMessage(role="user", content=request.message)
-        history.append(user_message_obj)
+        # The turn is only persisted once the stream completes
+        user_message_obj: GeminiMessage = {"role": "user", "parts": [request.message]}
         
-        # Generate AI response using full conversation history
-        reply = ai_service.generate_response(
+        chunks = ai_service.stream_response(
             user_message=request.message,
+            session_id=session_id,
             history=history
         )
-        
-        # Append AI response to history AFTER generation
-        ai_message_obj = ChatMessage(role="ai", content=reply)
-        history.append(ai_message_obj)
-        
-        # Save updated history back to session store
-        session_store.update_history(session_id, history)
-        
-        return ChatResponse(reply=reply, session_id=session_id)
+        # Pull the first chunk before responding so API errors still map to HTTP status codes
+        first_chunk = await anext(chunks, "")
+        streaming = True
         
     except ValueError as e:
         raise HTTPException(
@@ -112,6 +281,73 @@ def chat(request: ChatRequest) -> ChatResponse:
             status_code=500,
             detail=f"An unexpected error occurred: {str(e)}"
         )
+    finally:
+        if not streaming:
+            turn.release()
+    
+    turn.reply_parts.append(first_chunk)
+    
+    async def event_stream():
+        try:
+            yield f"data: {json.dumps({'delta': first_chunk})}\n\n"
+            async for chunk in chunks:
+                turn.reply_parts.append(chunk)
+                yield f"data: {json.dumps({'delta': chunk})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'session_id': session_id})}\n\n"
+            turn.completed = True
+        finally:
+            if not turn.completed:
+                # Client disconnected mid-stream; don't hold up the session's next turn
+                turn.release()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"X-Session-ID": session_id},
+        background=BackgroundTask(
+            _save_streamed_turn, session_store, session_id, user_message_obj, turn
+        ),
+    )
+
+
+class _StreamedTurn:
+    """State of a /chat/stream turn shared by the stream and its background save."""
+
+    def __init__(self, session_lock: Optional[asyncio.Lock]):
+        self.session_lock = session_lock
+        self.reply_parts: List[str] = []
+        self.completed = False
+
+    def release(self) -> None:
+        """Release the session lock if still held; safe to call more than once."""
+        if self.session_lock is not None:
+            lock, self.session_lock = self.session_lock, None
+            lock.release()
+
+
+async def _save_streamed_turn(
+    session_store: BaseSessionStore,
+    session_id: str,
+    user_message: GeminiMessage,
+    turn: _StreamedTurn
+) -> None:
+    """
+    Append a completed streamed turn to the session history and release the session lock.
+    
+    Args:
+        session_store: Session store to save to
+        session_id: Session identifier
+        user_message: The user's message for this turn
+        turn: State of the streamed turn
+    """
+    try:
+        if turn.completed:
+            reply = "".join(turn.reply_parts).strip()
+            await session_store.add_message(
+                session_id, user_message, {"role": "model", "parts": [reply]}
+            )
+    finally:
+        turn.release()
 
 
 @app.get("/")
@@ -123,6 +359,7 @@ def root():
         "status": "running",
         "endpoints": {
             "health": "/health",
-            "chat": "/chat (POST)"
+            "chat": "/chat (POST)",
+            "chat_stream": "/chat/stream (POST, text/event-stream)"
         }
     }
@@ -1,18 +1,21 @@
 """
 Request and response schemas for the Emo-ch AI API.
 """
-from typing import List, Literal, Optional
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, TypedDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
-class ChatMessage(BaseModel):
-    """Represents a single message in the conversation history."""
-    role: Literal["user", "ai", "model"]  # "ai" for frontend compatibility, "model" for Gemini
-    content: str
+class GeminiMessage(TypedDict):
+    """A stored conversation message, already in Gemini content format."""
+    role: Literal["user", "model"]
+    parts: List[str]
 
 
 class ChatRequest(BaseModel):
     """Request model for the /chat endpoint."""
+    # Extra fields are ignored, not forbidden: older clients still send "history"
+    model_config = ConfigDict(frozen=True, str_strip_whitespace=True)
+
     message: str = Field(..., min_length=1, max_length=4000, description="User's message")
     session_id: Optional[str] = Field(
         default=None,
@@ -22,6 +25,8 @@ class ChatRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     """Response model for the /chat endpoint."""
+    model_config = ConfigDict(frozen=True)
+
     reply: str = Field(..., description="AI-generated empathetic response")
     session_id: str = Field(..., description="Session ID for maintaining conversation history")
 
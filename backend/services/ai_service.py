@@ -1,13 +1,28 @@
 """
 AI service layer for generating empathetic responses using Google Gemini API.
 """
+import asyncio
 import os
-from typing import List, Optional
+from collections import OrderedDict
+from itertools import islice
+from typing import AsyncIterator, Optional, Sequence
 
 import google.generativeai as genai
 from fastapi import HTTPException
+from google.generativeai import ChatSession
 
-from models.schemas import ChatMessage
+from models.schemas import GeminiMessage
+
+# Upper bound on Gemini chat sessions kept in memory
+MAX_CACHED_CHATS = 10_000
+# Number of most recent messages sent to Gemini as conversation context
+MAX_CONTEXT_MESSAGES = 20
+
+# Reply used when Gemini fails or returns nothing
+FALLBACK_RESPONSE = (
+    "I'm here for you, and I want to understand what you're going through. "
+    "Could you tell me a bit more about how you're feeling right now?"
+)
 
 
 class AIService:
@@ -22,6 +37,8 @@ class AIService:
                 "Set it in your .env file."
             )
         
+        # The SDK's default gRPC transport keeps one long-lived HTTP/2 channel per
+        # client, so repeated calls reuse the connection instead of a new TLS handshake
         genai.configure(api_key=api_key)
         
         # Model configuration for empathetic responses
@@ -45,18 +62,47 @@ class AIService:
             self.model_name,
             system_instruction=system_instruction
         )
+        
+        # Generation settings shared by every request
+        self._generation_config = genai.types.GenerationConfig(
+            temperature=0.7,
+            max_output_tokens=300,
+            top_p=0.9,
+        )
+        
+        # Gemini chat sessions by session_id, least recently used first
+        self._chats: "OrderedDict[str, ChatSession]" = OrderedDict()
+    
+    async def warm_up(self) -> None:
+        """
+        Open the Gemini connection ahead of the first user request.
+        
+        Sends a token count request, which is not billed as generation, so the
+        async client, its gRPC channel and the TLS handshake are set up at startup.
+        Failures are ignored; the connection is then opened on first use instead.
+        """
+        try:
+            await asyncio.wait_for(self.model.count_tokens_async("hello"), timeout=10)
+        except Exception:
+            pass
     
-    def generate_response(
+    async def generate_response(
         self,
         user_message: str,
-        history: Optional[List[ChatMessage]] = None
+        session_id: str,
+        history: Optional[Sequence[GeminiMessage]] = None
     ) -> str:
         """
         Generate an empathetic AI response using Gemini API.
         
+        Reuses the session's cached Gemini chat when it is in sync with the
+        stored history, so earlier turns are not rebuilt on every request.
+        
         Args:
             user_message: The current user message
-            history: Optional conversation history
+            session_id: Session identifier used to look up the cached chat
+            history: Optional conversation history before this message,
+                used to seed a new chat on cache miss
             
         Returns:
             Generated empathetic response string
@@ -65,36 +111,17 @@ class AIService:
             HTTPException: If API call fails or returns invalid response
         """
         try:
-            # Build conversation context
-            if history and len(history) > 0:
-                # Build conversation history as messages for chat
-                chat_history = []
-                for msg in history[-20:]:  # Limit to last 20 messages
-                    role = "user" if msg.role == "user" else "model"
-                    chat_history.append({
-                        "role": role,
-                        "parts": [msg.content]
-                    })
-                
-                # Start chat session with history
-                chat = self.model.start_chat(history=chat_history)
-                response = chat.send_message(
+            chat = self._checkout_chat(session_id, history)
+            if chat is not None:
+                response = await chat.send_message_async(
                     user_message,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.7,
-                        max_output_tokens=300,
-                        top_p=0.9,
-                    )
+                    generation_config=self._generation_config
                 )
             else:
                 # No history - direct generation
-                response = self.model.generate_content(
+                response = await self.model.generate_content_async(
                     user_message,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=0.7,
-                        max_output_tokens=300,
-                        top_p=0.9,
-                    )
+                    generation_config=self._generation_config
                 )
             
             # Extract text from response
@@ -104,26 +131,161 @@ class AIService:
                 # Fallback response if API returns empty
                 return self._get_fallback_response(user_message)
             
+            if chat is not None:
+                self._checkin_chat(session_id, chat)
             return reply
             
         except Exception as e:
-            # Log error details for debugging
-            error_msg = str(e)
+            self._raise_for_api_error(e)
+            # Return fallback response instead of crashing
+            return self._get_fallback_response(user_message)
+    
+    async def stream_response(
+        self,
+        user_message: str,
+        session_id: str,
+        history: Optional[Sequence[GeminiMessage]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream an empathetic AI response from Gemini as text chunks.
+        
+        Args:
+            user_message: The current user message
+            session_id: Session identifier used to look up the cached chat
+            history: Optional conversation history before this message,
+                used to seed a new chat on cache miss
             
-            # Provide user-friendly error messages
-            if "API_KEY" in error_msg or "authentication" in error_msg.lower():
-                raise HTTPException(
-                    status_code=500,
-                    detail="AI service authentication failed. Please check API key configuration."
-                )
-            elif "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
-                raise HTTPException(
-                    status_code=503,
-                    detail="AI service is temporarily unavailable due to rate limits. Please try again later."
+        Yields:
+            Text chunks of the generated response, in order
+            
+        Raises:
+            HTTPException: If the API call fails before any text was produced
+        """
+        produced = False
+        try:
+            chat = self._checkout_chat(session_id, history)
+            if chat is not None:
+                response = await chat.send_message_async(
+                    user_message,
+                    generation_config=self._generation_config,
+                    stream=True
                 )
             else:
-                # Return fallback response instead of crashing
-                return self._get_fallback_response(user_message)
+                response = await self.model.generate_content_async(
+                    user_message,
+                    generation_config=self._generation_config,
+                    stream=True
+                )
+            
+            async for chunk in response:
+                if chunk.text:
+                    produced = True
+                    yield chunk.text
+            
+            if produced and chat is not None:
+                self._checkin_chat(session_id, chat)
+                    
+        except Exception as e:
+            if produced:
+                # Part of the reply is already on the wire; end the stream there
+                return
+            self._raise_for_api_error(e)
+        
+        if not produced:
+            # Fallback response if API returns empty or fails
+            yield self._get_fallback_response(user_message)
+    
+    def _checkout_chat(
+        self,
+        session_id: str,
+        history: Optional[Sequence[GeminiMessage]]
+    ) -> Optional[ChatSession]:
+        """
+        Take the session's Gemini chat out of the cache, or start a new one.
+        
+        First turns have no history to seed, so no chat is created for them
+        and the caller generates directly from the model instead.
+        
+        The chat is removed while in use so concurrent requests for the same
+        session never share one; it is returned by _checkin_chat on success.
+        A cached chat is discarded if its last reply doesn't match the stored
+        history, e.g. when another worker process handled the previous turn.
+        
+        Args:
+            session_id: Session identifier
+            history: Stored conversation history before the current message
+            
+        Returns:
+            ChatSession ready to send the current message, or None on the first turn
+        """
+        chat = self._chats.pop(session_id, None)
+        if not history:
+            return None
+        if chat is not None and self._is_in_sync(chat, history):
+            return chat
+        # Stored messages are already in Gemini format; copy only the context window
+        start = max(0, len(history) - MAX_CONTEXT_MESSAGES)
+        return self.model.start_chat(history=list(islice(history, start, None)))
+    
+    def _checkin_chat(self, session_id: str, chat: ChatSession) -> None:
+        """
+        Return a chat to the cache after a successful turn.
+        
+        Args:
+            session_id: Session identifier
+            chat: Chat session that just completed a turn
+        """
+        chat_history = chat.history
+        if len(chat_history) > MAX_CONTEXT_MESSAGES:
+            chat.history = chat_history[-MAX_CONTEXT_MESSAGES:]
+        self._chats[session_id] = chat
+        if len(self._chats) > MAX_CACHED_CHATS:
+            # Evict the least recently used chat
+            self._chats.popitem(last=False)
+    
+    def _is_in_sync(self, chat: ChatSession, history: Sequence[GeminiMessage]) -> bool:
+        """
+        Check whether a cached chat ends with the same message as the stored history.
+        
+        Args:
+            chat: Cached chat session
+            history: Stored conversation history, non-empty
+            
+        Returns:
+            True if the chat can be reused for the next turn
+        """
+        try:
+            if not chat.history:
+                return False
+            return chat.history[-1].parts[0].text.strip() == history[-1]["parts"][0]
+        except Exception:
+            return False
+    
+    def _raise_for_api_error(self, error: Exception) -> None:
+        """
+        Raise a user-friendly HTTPException for non-recoverable API errors.
+        
+        Returns normally for any other error so the caller can fall back.
+        
+        Args:
+            error: Exception raised by the Gemini client
+            
+        Raises:
+            HTTPException: On authentication or rate limit failures
+        """
+        error_msg = str(error).lower()
+        
+        # Provide user-friendly error messages
+        if "api_key" in error_msg or "authentication" in error_msg:
+            raise HTTPException(
+                status_code=500,
+                detail="AI service authentication failed. Please check API key configuration."
+            )
+        elif "quota" in error_msg or "rate limit" in error_msg:
+            raise HTTPException(
+                status_code=503,
+                detail="AI service is temporarily unavailable due to rate limits. Please try again later."
+            )
     
     def _get_fallback_response(self, user_message: str) -> str:
         """
@@ -135,27 +297,4 @@ class AIService:
         Returns:
             A simple empathetic fallback message
         """
-        return (
-            "I'm here for you, and I want to understand what you're going through. "
-            "Could you tell me a bit more about how you're feeling right now?"
-        )
-
-
-# Singleton instance (initialized on first import)
-_ai_service: Optional[AIService] = None
-
-
-def get_ai_service() -> AIService:
-    """
-    Get or create the singleton AI service instance.
-    
-    Returns:
-        AIService instance
-        
-    Raises:
-        ValueError: If GEMINI_API_KEY is not configured
-    """
-    global _ai_service
-    if _ai_service is None:
-        _ai_service = AIService()
-    return _ai_service
+        return FALLBACK_RESPONSE
@@ -0,0 +1,80 @@
+"""
+Redis-backed session store for sharing conversation history across worker processes.
+Each session is a Redis list of JSON-serialized GeminiMessage dicts.
+"""
+import json
+import os
+import secrets
+from typing import List, Optional
+
+import redis.asyncio as redis
+
+from models.schemas import GeminiMessage
+from services.session_store import MAX_MESSAGES, BaseSessionStore
+
+
+class RedisSessionStore(BaseSessionStore):
+    """
+    Session store keeping each conversation in a capped Redis list.
+    Sessions expire after a period of inactivity.
+    """
+
+    def __init__(self, url: str, key_prefix: str = "emoch:session:"):
+        super().__init__()
+        self._redis = redis.from_url(url)
+        self._key_prefix = key_prefix
+        self._ttl_seconds = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+
+    def _key(self, session_id: str) -> str:
+        return f"{self._key_prefix}{session_id}"
+
+    async def create_session(self) -> str:
+        """
+        Create a new chat session and return its ID.
+        
+        Redis does not store empty lists, so the session key is only
+        created when its first message is added.
+        
+        Returns:
+            New session ID (random URL-safe string)
+        """
+        return secrets.token_urlsafe(16)
+
+    async def get_history(self, session_id: str) -> Optional[List[GeminiMessage]]:
+        """
+        Retrieve conversation history for a session.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            List of GeminiMessage dicts, or None if session doesn't exist
+        """
+        items = await self._redis.lrange(self._key(session_id), 0, -1)
+        if not items:
+            return None
+        return [json.loads(item) for item in items]
+
+    async def add_message(self, session_id: str, *messages: GeminiMessage) -> None:
+        """
+        Add messages to the session's conversation history.
+        
+        Appends, trims to the last 50 messages and refreshes the expiry
+        in a single round-trip.
+        
+        Args:
+            session_id: Session identifier
+            messages: GeminiMessage dicts to add, in order
+        """
+        if not messages:
+            return
+        key = self._key(session_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, *(json.dumps(m) for m in messages))
+            pipe.ltrim(key, -MAX_MESSAGES, -1)
+            pipe.expire(key, self._ttl_seconds)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        await self._redis.aclose()
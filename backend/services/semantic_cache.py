@@ -0,0 +1,96 @@
+"""
+Semantic cache for reusing replies to first messages that closely match an earlier one.
+
+Requires the optional sentence-transformers and faiss-cpu packages, which are
+only imported when the cache is enabled with SEMANTIC_CACHE_ENABLED=1.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, List, Optional, Tuple
+
+# Sentence embedding model used to compare messages
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Upper bound on cached replies; new replies are not cached once reached
+MAX_CACHED_REPLIES = 10_000
+
+
+class SemanticCache:
+    """
+    Cache of Gemini replies keyed by message meaning rather than exact text.
+    
+    Messages are embedded with a sentence-transformers model and stored in a
+    FAISS inner-product index over normalized vectors, so search scores are
+    cosine similarities. A lookup hits when the nearest cached message scores
+    at or above the similarity threshold.
+    
+    Only first messages of a session are cached, because later replies depend
+    on the conversation so far.
+    """
+
+    def __init__(self, threshold: float = 0.95):
+        # Imported lazily so these packages are only required when enabled
+        import faiss
+        from sentence_transformers import SentenceTransformer
+
+        self._threshold = threshold
+        self._model = SentenceTransformer(EMBEDDING_MODEL)
+        self._index = faiss.IndexFlatIP(self._model.get_sentence_embedding_dimension())
+        self._replies: List[str] = []
+        # Guards the index, which is searched and updated from worker threads
+        self._lock = threading.Lock()
+
+    async def lookup(self, message: str) -> Tuple[Optional[str], Any]:
+        """
+        Find a cached reply for a message similar to this one.
+        
+        Embedding runs in a worker thread so it doesn't block the event loop.
+        
+        Args:
+            message: The user's message
+        
+        Returns:
+            Tuple of the cached reply (or None on a miss) and the message
+            embedding, which can be passed to add() to avoid re-embedding
+        """
+        return await asyncio.to_thread(self._lookup, message)
+
+    async def add(self, embedding: Any, reply: str) -> None:
+        """
+        Cache a reply under a message embedding returned by lookup().
+        
+        Args:
+            embedding: Message embedding from lookup()
+            reply: Gemini reply to reuse for similar messages
+        """
+        await asyncio.to_thread(self._add, embedding, reply)
+
+    def _lookup(self, message: str) -> Tuple[Optional[str], Any]:
+        embedding = self._model.encode([message], normalize_embeddings=True)
+        with self._lock:
+            if self._index.ntotal == 0:
+                return None, embedding
+            scores, ids = self._index.search(embedding, 1)
+            if scores[0][0] >= self._threshold:
+                return self._replies[ids[0][0]], embedding
+        return None, embedding
+
+    def _add(self, embedding: Any, reply: str) -> None:
+        with self._lock:
+            if self._index.ntotal >= MAX_CACHED_REPLIES:
+                return
+            self._index.add(embedding)
+            self._replies.append(reply)
+
+
+def create_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Create the semantic cache if enabled by the environment.
+    
+    Returns:
+        SemanticCache if SEMANTIC_CACHE_ENABLED is set, otherwise None
+    """
+    if os.getenv("SEMANTIC_CACHE_ENABLED", "").lower() not in ("1", "true", "yes"):
+        return None
+    threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    return SemanticCache(threshold=threshold)
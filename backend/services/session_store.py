@@ -1,35 +1,94 @@
 """
-In-memory session store for maintaining conversation history across requests.
-Each session stores a list of ChatMessage objects representing the full conversation.
+Session stores for maintaining conversation history across requests.
+Each session stores its conversation as messages in Gemini content format.
+
+The in-memory store is used by default. Set REDIS_URL to share sessions
+between worker processes via RedisSessionStore.
 """
-import uuid
-from typing import Dict, List, Optional
+import asyncio
+import os
+import secrets
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Dict, Optional, Sequence
+from weakref import WeakValueDictionary
+
+from models.schemas import GeminiMessage
 
-from models.schemas import ChatMessage
+# Keep last 50 messages per session to prevent memory issues
+MAX_MESSAGES = 50
 
 
-class SessionStore:
+class BaseSessionStore(ABC):
+    """
+    Common interface for chat session stores.
+    Provides per-session locking; subclasses implement storage.
+    """
+
+    def __init__(self):
+        # Per-session locks, dropped automatically once no request holds them
+        self._locks: "WeakValueDictionary[str, asyncio.Lock]" = WeakValueDictionary()
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """
+        Get the asyncio lock guarding a session's history.
+        
+        Concurrent requests for the same session must hold this lock across
+        the read-generate-write cycle so turns are not lost or interleaved.
+        The lock is local to this process.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            asyncio.Lock shared by all requests for this session
+        """
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        return lock
+
+    @abstractmethod
+    async def create_session(self) -> str:
+        """Create a new chat session and return its ID."""
+
+    @abstractmethod
+    async def get_history(self, session_id: str) -> Optional[Sequence[GeminiMessage]]:
+        """Retrieve conversation history, or None if the session doesn't exist."""
+
+    @abstractmethod
+    async def add_message(self, session_id: str, *messages: GeminiMessage) -> None:
+        """Append one or more messages to the session's conversation history."""
+
+    async def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+class SessionStore(BaseSessionStore):
     """
     Thread-safe in-memory store for chat sessions.
     Each session maintains its own conversation history.
+    Sessions are local to the process and lost on restart.
     """
 
     def __init__(self):
-        # Dictionary mapping session_id -> List[ChatMessage]
-        self._sessions: Dict[str, List[ChatMessage]] = {}
+        super().__init__()
+        # Dictionary mapping session_id -> bounded deque of GeminiMessage
+        self._sessions: Dict[str, Deque[GeminiMessage]] = {}
 
-    def create_session(self) -> str:
+    async def create_session(self) -> str:
         """
         Create a new chat session and return its ID.
         
         Returns:
-            New session ID (UUID string)
+            New session ID (random URL-safe string)
         """
-        session_id = str(uuid.uuid4())
-        self._sessions[session_id] = []
+        session_id = secrets.token_urlsafe(16)
+        self._sessions[session_id] = deque(maxlen=MAX_MESSAGES)
         return session_id
 
-    def get_history(self, session_id: str) -> Optional[List[ChatMessage]]:
+    async def get_history(self, session_id: str) -> Optional[Deque[GeminiMessage]]:
         """
         Retrieve conversation history for a session.
         
@@ -37,53 +96,36 @@ class SessionStore:
             session_id: Session identifier
             
         Returns:
-            List of ChatMessage objects, or None if session doesn't exist
+            Deque of GeminiMessage dicts, or None if session doesn't exist
         """
         return self._sessions.get(session_id)
 
-    def add_message(self, session_id: str, message: ChatMessage) -> None:
+    async def add_message(self, session_id: str, *messages: GeminiMessage) -> None:
         """
-        Add a message to the session's conversation history.
+        Add messages to the session's conversation history.
         
         Args:
             session_id: Session identifier
-            message: ChatMessage to add
+            messages: GeminiMessage dicts to add, in order
         """
-        if session_id not in self._sessions:
-            self._sessions[session_id] = []
+        history = self._sessions.get(session_id)
+        if history is None:
+            history = self._sessions[session_id] = deque(maxlen=MAX_MESSAGES)
         
-        # Limit history to last 50 messages to prevent memory issues
-        self._sessions[session_id].append(message)
-        if len(self._sessions[session_id]) > 50:
-            self._sessions[session_id] = self._sessions[session_id][-50:]
+        # The bounded deque drops the oldest messages on overflow
+        history.extend(messages)
 
-    def update_history(self, session_id: str, history: List[ChatMessage]) -> None:
-        """
-        Replace the entire history for a session.
-        
-        Args:
-            session_id: Session identifier
-            history: New conversation history
-        """
-        self._sessions[session_id] = history[-50:]  # Keep last 50 messages
 
-    def session_exists(self, session_id: str) -> bool:
-        """
-        Check if a session exists.
-        
-        Args:
-            session_id: Session identifier
-            
-        Returns:
-            True if session exists, False otherwise
-        """
-        return session_id in self._sessions
-
-
-# Global singleton instance
-_session_store = SessionStore()
-
-
-def get_session_store() -> SessionStore:
-    """Get the global session store instance."""
-    return _session_store
+def create_session_store() -> BaseSessionStore:
+    """
+    Create the session store configured by the environment.
+    
+    Returns:
+        RedisSessionStore if REDIS_URL is set, otherwise an in-memory SessionStore
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        # Imported lazily so the redis package is only required when used
+        from services.redis_session_store import RedisSessionStore
+        return RedisSessionStore(redis_url)
+    return SessionStore()
@@ -0,0 +1,24 @@
+#!/usr/bin/env sh
+# Production entrypoint: gunicorn managing uvicorn worker processes.
+#
+# WEB_CONCURRENCY sets the number of workers. It defaults to one per CPU
+# when REDIS_URL is set, and to a single worker otherwise, because the
+# in-memory session store is not shared between processes.
+set -e
+
+cd "$(dirname "$0")"
+
+if [ -z "$WEB_CONCURRENCY" ]; then
+    if [ -n "$REDIS_URL" ]; then
+        WEB_CONCURRENCY=$(nproc)
+    else
+        WEB_CONCURRENCY=1
+    fi
+elif [ "$WEB_CONCURRENCY" -gt 1 ] && [ -z "$REDIS_URL" ]; then
+    echo "warning: WEB_CONCURRENCY=$WEB_CONCURRENCY without REDIS_URL; sessions will not be shared between workers" >&2
+fi
+
+exec gunicorn main:app \
+    -k uvicorn.workers.UvicornWorker \
+    -w "$WEB_CONCURRENCY" \
+    --bind "0.0.0.0:${PORT:-8000}"
@@ -0,0 +1,8 @@
+"""
+Pytest configuration for the Emo-ch AI backend tests.
+"""
+import os
+import sys
+
+# Tests import the app's packages the same way main.py does, from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
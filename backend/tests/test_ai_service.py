@@ -0,0 +1,115 @@
+"""
+Tests for AIService's per-session Gemini chat cache.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.ai_service import FALLBACK_RESPONSE, MAX_CONTEXT_MESSAGES, AIService
+
+
+def _content(role, text):
+    """Build an object shaped like a Gemini Content message."""
+    return SimpleNamespace(role=role, parts=[SimpleNamespace(text=text)])
+
+
+class FakeChat:
+    """Stand-in for ChatSession that records turns in its history like the SDK does."""
+
+    def __init__(self, model, history):
+        self.model = model
+        self.history = [_content(m["role"], m["parts"][0]) for m in history]
+
+    async def send_message_async(self, message, **kwargs):
+        if self.model.error is not None:
+            raise self.model.error
+        self.history = self.history + [
+            _content("user", message),
+            _content("model", self.model.reply),
+        ]
+        return SimpleNamespace(text=self.model.reply)
+
+
+class FakeModel:
+    """Stand-in for GenerativeModel that counts how many chats were started."""
+
+    def __init__(self):
+        self.reply = "That sounds really hard. I'm here with you."
+        self.error = None
+        self.started = []
+
+    def start_chat(self, history):
+        chat = FakeChat(self, history)
+        self.started.append(chat)
+        return chat
+
+    async def generate_content_async(self, message, **kwargs):
+        return SimpleNamespace(text=self.reply)
+
+
+@pytest.fixture
+def ai_service(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    service = AIService()
+    service.model = FakeModel()
+    return service
+
+
+def _turn(user_text, reply):
+    return [
+        {"role": "user", "parts": [user_text]},
+        {"role": "model", "parts": [reply]},
+    ]
+
+
+def test_cached_chat_is_reused_for_next_turn(ai_service):
+    history = _turn("hello", "Hi, how are you feeling?")
+
+    reply = asyncio.run(ai_service.generate_response("not great", "s1", history))
+    history = history + _turn("not great", reply)
+    asyncio.run(ai_service.generate_response("work is stressful", "s1", history))
+
+    assert len(ai_service.model.started) == 1
+    assert ai_service._chats["s1"] is ai_service.model.started[0]
+
+
+def test_chat_is_reseeded_when_another_worker_handled_a_turn(ai_service):
+    history = _turn("hello", "Hi, how are you feeling?")
+
+    reply = asyncio.run(ai_service.generate_response("not great", "s1", history))
+    # The stored history ends with a reply this process never saw
+    history = history + _turn("not great", reply) + _turn("still here", "Other worker's reply")
+    asyncio.run(ai_service.generate_response("thanks", "s1", history))
+
+    assert len(ai_service.model.started) == 2
+    reseeded = ai_service.model.started[1]
+    assert [m.parts[0].text for m in reseeded.history[:len(history)]] == [
+        m["parts"][0] for m in history
+    ]
+
+
+def test_failed_turn_does_not_check_chat_back_in(ai_service):
+    history = _turn("hello", "Hi, how are you feeling?")
+    reply = asyncio.run(ai_service.generate_response("not great", "s1", history))
+    assert "s1" in ai_service._chats
+
+    ai_service.model.error = RuntimeError("connection reset")
+    history = history + _turn("not great", reply)
+    reply = asyncio.run(ai_service.generate_response("are you there?", "s1", history))
+
+    assert reply == FALLBACK_RESPONSE
+    assert "s1" not in ai_service._chats
+
+
+def test_cached_chat_history_is_trimmed_to_context_window(ai_service):
+    history = []
+    for i in range(MAX_CONTEXT_MESSAGES // 2):
+        history += _turn(f"message {i}", f"reply {i}")
+
+    asyncio.run(ai_service.generate_response("one more", "s1", history))
+
+    chat = ai_service._chats["s1"]
+    assert len(chat.history) == MAX_CONTEXT_MESSAGES
+    assert chat.history[0].parts[0].text == "message 1"
+    assert chat.history[-1].parts[0].text == ai_service.model.reply